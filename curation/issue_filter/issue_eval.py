@@ -1,13 +1,17 @@
+import asyncio
+import hashlib
 import json
 import re
-from tqdm import tqdm
-from multiprocessing import Pool
-from utils import request_g4
+import httpx
+import orjson
+from tqdm.asyncio import tqdm
+from utils import request_g4_async
 import os
 import argparse
 
-# Standard evaluation prompt template for Issue quality assessment
-EVAL_PROMPT = """
+# Shared scoring rubric for Issue quality assessment, used by both the
+# single-issue and the batched prompt templates
+EVAL_RUBRIC = """
 **Role Definition**
 You are an experienced software engineer. You need to evaluate the quality of an Issue to determine if it contains sufficient information for an engineer to unambiguously provide a solution.
 
@@ -38,7 +42,10 @@ Check for deduction items item by item. If the issue has problems or violates th
 - Excessive Reliance on External Resources:
   (1) Core info relies on external links: Key descriptions/logs/steps are in links that may fail or be inaccessible.
   (2) Reliance on private repos: Reproduction depends on non-public codebases.
+"""
 
+# Standard evaluation prompt template for a single Issue
+EVAL_PROMPT = EVAL_RUBRIC + """
 **Input Content**
 Issue
 {issue}
@@ -49,14 +56,62 @@ reason for evaluation: xxx
 issue score: 0-10
 """
 
+# Batched variant: scoring several issues per call amortizes the rubric
+# prefill and the HTTP round-trip across the whole batch
+BATCH_EVAL_PROMPT = EVAL_RUBRIC + """
+**Input Content**
+You are given {count} independent issues. Each one starts with a marker line "### Issue <n>".
+Evaluate every issue separately under the standards above.
+
+{issues}
+
+**Output Format**
+Strictly output a JSON array with exactly one object per issue, in input order:
+[{{"id": 1, "reason": "...", "score": 5}}, {{"id": 2, "reason": "...", "score": 8}}, ...]
+"""
+
 MODEL_ID = "deepseek-v3.2"
 MAX_RETRIES = 3
+# LLM calls are pure network waits, so a single event loop with bounded
+# concurrency replaces the old 32-process pool at a fraction of the memory
+MAX_CONCURRENCY = 64
+# Issues scored per LLM call
+BATCH_SIZE = 8
+# Bump when EVAL_PROMPT changes so stale cache entries are invalidated
+PROMPT_VERSION = 1
+CACHE_DIR = ".cache/issue_eval"
+
+def _cache_path(problem_statement: str) -> str:
+    key = hashlib.sha256(
+        (MODEL_ID + str(PROMPT_VERSION) + problem_statement).encode()
+    ).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def load_cached_eval(problem_statement: str) -> dict:
+    """Load the cached evaluation for an identical issue, or None"""
+    try:
+        with open(_cache_path(problem_statement), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_cached_eval(problem_statement: str, eval_fields: dict):
+    """Persist evaluation fields so identical issues are never re-sent to the LLM"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(problem_statement)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(eval_fields, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+# Compiled once at import; parse_eval_response runs for every evaluated issue
+_ANALYSIS_RE = re.compile(r"reason for evaluation:(.*?)issue score:", re.DOTALL)
+_SCORE_RE = re.compile(r"issue score:(\d+)")
 
 def parse_eval_response(response: str) -> tuple:
     """Parse evaluation response to extract score and analysis"""
     try:
-        analysis = re.search(r"reason for evaluation:(.*?)issue score:", response, re.DOTALL)
-        score = re.search(r"issue score:(\d+)", response)
+        analysis = _ANALYSIS_RE.search(response)
+        score = _SCORE_RE.search(response)
         
         if not analysis or not score:
             raise ValueError("Invalid response format")
@@ -65,24 +120,37 @@ def parse_eval_response(response: str) -> tuple:
     except Exception as e:
         raise ValueError(f"Failed to parse response: {str(e)}")
 
-def get_eval_response(line: dict) -> dict:
+def iter_jsonl(path: str):
+    """Lazily yield one parsed instance per input line"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
+async def get_eval_response(client: httpx.AsyncClient, line: dict) -> dict:
     """Get evaluation result for a single issue"""
     issue_text = f"{line['problem_statement']}"
     input_prompt = EVAL_PROMPT.format(issue=issue_text)
-    
+
+    # The LLM call is the expensive step; identical issues are served from disk
+    cached = load_cached_eval(issue_text)
+    if cached is not None:
+        return {**line, **cached}
+
     for attempt in range(MAX_RETRIES):
         try:
-            reasoning, response = request_g4([input_prompt], model_id=MODEL_ID)
+            reasoning, response = await request_g4_async(client, [input_prompt], model_id=MODEL_ID)
             # print(response)
             analysis, score = parse_eval_response(response)
-            
-            return {
-                **line,
+
+            eval_fields = {
                 "issue_filter_result": response,
                 "issue_filter_reason": reasoning,
                 "issue_filter_score": score,
                 "issue_filter_analysis": analysis
             }
+            save_cached_eval(issue_text, eval_fields)
+            return {**line, **eval_fields}
         except Exception as e:
             print(f"Attempt {attempt + 1} failed for issue {line.get('id', 'unknown')}: {str(e)}")
             if attempt == MAX_RETRIES - 1:
@@ -93,19 +161,116 @@ def get_eval_response(line: dict) -> dict:
                     "issue_filter_score": -1,
                     "issue_filter_analysis": ""
                 }
-def save_results(results: list, output_file: str):
-    """Save evaluation results to file"""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for result in results:
-            f.write(json.dumps(result, ensure_ascii=False) + '\n')
-
-def save_filtered_results(results: list, output_file: str):
-    """Save filtered results (score >= 5)"""
-    filtered = [r for r in results if r.get("issue_filter_score", -1) >= 5]
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for result in filtered:
-            f.write(json.dumps(result, ensure_ascii=False) + '\n')
-    return len(filtered)
+
+def build_batch_prompt(batch: list) -> str:
+    """Render the batched prompt for a list of issues"""
+    issues = "\n\n".join(
+        f"### Issue {idx + 1}\n{line['problem_statement']}"
+        for idx, line in enumerate(batch)
+    )
+    return BATCH_EVAL_PROMPT.format(count=len(batch), issues=issues)
+
+def parse_batch_response(response: str, expected_count: int) -> list:
+    """Parse the JSON array of a batched response into (analysis, score) pairs"""
+    start = response.find('[')
+    end = response.rfind(']')
+    if start == -1 or end <= start:
+        raise ValueError("No JSON array in batched response")
+    entries = orjson.loads(response[start:end + 1])
+    if len(entries) != expected_count:
+        raise ValueError(f"Expected {expected_count} entries, got {len(entries)}")
+    entries.sort(key=lambda entry: entry["id"])
+    return [(str(entry["reason"]).strip(), int(entry["score"])) for entry in entries]
+
+async def get_batch_eval_response(client: httpx.AsyncClient, batch: list) -> list:
+    """Score a batch of issues with a single LLM call.
+
+    Falls back to per-issue evaluation when the batched response cannot be
+    parsed, so a malformed array never loses a whole batch.
+    """
+    input_prompt = build_batch_prompt(batch)
+    try:
+        reasoning, response = await request_g4_async(client, [input_prompt], model_id=MODEL_ID)
+        entries = parse_batch_response(response, len(batch))
+    except Exception as e:
+        print(f"Batch evaluation failed, falling back to per-issue calls: {str(e)}")
+        return [await get_eval_response(client, line) for line in batch]
+
+    results = []
+    for line, (analysis, score) in zip(batch, entries):
+        eval_fields = {
+            "issue_filter_result": f"reason for evaluation: {analysis}\nissue score: {score}",
+            "issue_filter_reason": reasoning,
+            "issue_filter_score": score,
+            "issue_filter_analysis": analysis
+        }
+        save_cached_eval(f"{line['problem_statement']}", eval_fields)
+        results.append({**line, **eval_fields})
+    return results
+
+async def evaluate_issues(lines, output_file: str, filtered_output_file: str) -> tuple:
+    """Evaluate issues from a lazy iterable with bounded concurrency.
+
+    Uncached issues are grouped into batches of BATCH_SIZE, each scored by
+    one LLM call; cached issues bypass the queue entirely. Results are
+    streamed to `output_file` (and to `filtered_output_file` when
+    score >= 5) as they complete, so neither the input corpus nor the
+    result list is ever fully materialized in memory.
+    """
+    queue = asyncio.Queue(maxsize=2 * MAX_CONCURRENCY)
+    total_count = 0
+    filtered_count = 0
+    progress = tqdm(desc="Evaluating issues")
+
+    # All workers talk to the same host, so HTTP/2 multiplexing over a few
+    # keep-alive connections replaces one TCP socket per in-flight request
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+    with open(output_file, 'wb') as out_f, open(filtered_output_file, 'wb') as filtered_f:
+
+        def write_result(result):
+            nonlocal total_count, filtered_count
+            out_f.write(orjson.dumps(result) + b'\n')
+            total_count += 1
+            if result.get("issue_filter_score", -1) >= 5:
+                filtered_f.write(orjson.dumps(result) + b'\n')
+                filtered_count += 1
+            progress.update(1)
+
+        async def worker(client):
+            while True:
+                batch = await queue.get()
+                try:
+                    for result in await get_batch_eval_response(client, batch):
+                        write_result(result)
+                except Exception as e:
+                    # Keep the worker alive; a dead pool would stall the feed loop
+                    print(f"Worker failed on a batch of {len(batch)} issues: {str(e)}")
+                finally:
+                    queue.task_done()
+
+        async with httpx.AsyncClient(http2=True, limits=limits, timeout=30) as client:
+            workers = [
+                asyncio.create_task(worker(client))
+                for _ in range(MAX_CONCURRENCY)
+            ]
+            batch = []
+            for line in lines:
+                # Previously scored issues are served from disk right here
+                cached = load_cached_eval(f"{line['problem_statement']}")
+                if cached is not None:
+                    write_result({**line, **cached})
+                    continue
+                batch.append(line)
+                if len(batch) >= BATCH_SIZE:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
+            await queue.join()
+            for w in workers:
+                w.cancel()
+    progress.close()
+    return total_count, filtered_count
 
 if __name__ == "__main__": 
     parser = argparse.ArgumentParser()
@@ -130,24 +295,11 @@ if __name__ == "__main__":
     output_file = f"{args.output_dir}/{basename}.evaluation_result"
     filtered_output_file = f"{args.output_dir}/{basename}.issue_filter"
 
-    # Read input data
-    with open(args.input_file, 'r', encoding='utf-8') as f:
-        test_data = [json.loads(line) for line in f]
-
-    # Parallel evaluation processing
-    with Pool(processes=32) as pool:
-        results = list(tqdm(
-            pool.imap(get_eval_response, test_data),
-            total=len(test_data),
-            desc="Evaluating issues"
-        ))
-
-    # Save all results
-    save_results(results, output_file)
-    total_count = len(results)
-    print(f"Evaluation completed. Total issues: {total_count}. Results saved to {output_file}")
+    # Stream input lines through the evaluator and results straight to disk
+    total_count, filtered_count = asyncio.run(
+        evaluate_issues(iter_jsonl(args.input_file), output_file, filtered_output_file)
+    )
 
-    # Save filtered results
-    filtered_count = save_filtered_results(results, filtered_output_file)
+    print(f"Evaluation completed. Total issues: {total_count}. Results saved to {output_file}")
     print(f"Filtered results: {filtered_count}/{total_count} issues with score >=5, saved to {filtered_output_file}")
     print(f"Filter ratio: {filtered_count/total_count:.1%}")
@@ -1,11 +1,23 @@
 from collections import Counter
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import random
 import json
 import time
 import uuid
 import os
 
+# One shared session so concurrent callers reuse keep-alive connections
+# instead of paying a TCP+TLS handshake per request
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=64,
+    pool_maxsize=128,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
 
 def convert_context_to_messages(context, system_message=""):
     assert len(context) % 2 == 1
@@ -21,7 +33,7 @@ def convert_context_to_messages(context, system_message=""):
     return messages
 
 
-def request_g4(context, model_id, system_message=""):
+def _build_g4_request(context, model_id, system_message=""):
     # Configure your API endpoint and key
     url = os.environ.get("OPENAI_API_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
     api_key = os.environ.get("OPENAI_KEY", "your-api-key-here")
@@ -39,18 +51,23 @@ def request_g4(context, model_id, system_message=""):
                 }
             }
         }
-        
+
     headers = {
         'Authorization': f'Bearer {api_key}',
         'Content-Type': 'application/json'
     }
+    return url, payload, headers
+
+
+def request_g4(context, model_id, system_message=""):
+    url, payload, headers = _build_g4_request(context, model_id, system_message)
 
     try_num = 3
     res = {"choices": None}
     while try_num > 0 and res["choices"] == None:
         try:
             try_num -= 1
-            res = requests.request("POST", url, json=payload, timeout=1000, headers=headers).json()
+            res = _session.post(url, json=payload, timeout=1000, headers=headers).json()
             # print(json.dumps(res, indent=2, ensure_ascii=False))
             response, reasoning, _, _ = parse_g4_result(res)
         except Exception as e:
@@ -63,6 +80,28 @@ def request_g4(context, model_id, system_message=""):
     else:
         return reasoning, response
 
+async def request_g4_async(client, context, model_id, system_message=""):
+    """Async variant of request_g4 sharing one httpx client across tasks"""
+    url, payload, headers = _build_g4_request(context, model_id, system_message)
+
+    try_num = 3
+    res = {"choices": None}
+    while try_num > 0 and res["choices"] == None:
+        try:
+            try_num -= 1
+            resp = await client.post(url, json=payload, headers=headers, timeout=1000)
+            res = resp.json()
+            response, reasoning, _, _ = parse_g4_result(res)
+        except Exception as e:
+            print(f"{try_num}, {e}")
+            res = {"choices": None}
+            await asyncio.sleep(1)
+
+    if res["choices"] == None:
+        return "ERROR", "ERROR"
+    else:
+        return reasoning, response
+
 def parse_g4_result(result):
     response = result["choices"][0]["message"]["content"]
     if "reasoning_content" in result["choices"][0]["message"]:
@@ -4,6 +4,10 @@ import argparse
 import json
 import logging
 import os
+import orjson
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 # import sys
 # sys.path.append("../")
@@ -25,8 +29,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# create_instance is dominated by GitHub round-trips, so threads overlap the
+# network waits; validation and file writes stay on the main thread
+MAX_WORKERS = 32
 
-def create_instance(repo: Repo, pull: dict) -> dict:
+
+def create_instance(repo: Repo, pull: dict, instance_id: str) -> dict:
     """
     Create a single task instance from a pull request, where task instance is:
 
@@ -52,9 +60,7 @@ def create_instance(repo: Repo, pull: dict) -> dict:
     return {
         "repo": repo.full_name,
         "pull_number": pull["number"],
-        "instance_id": (repo.full_name + "-" + str(pull["number"])).replace(
-            "/", "__"
-        ),
+        "instance_id": instance_id,
         "issue_numbers": pull["resolved_issues"],
         "base_commit": pull["base"]["sha"],
         "patch": patch,
@@ -88,6 +94,21 @@ def main(pr_file: str, output: str, language:str,token: Optional[str] = None):
         return Repo(owner, repo, language,token=token)
 
     repos = dict()
+    repo_keys = dict()
+    repos_lock = threading.Lock()
+
+    def get_repo(repo_name):
+        # Repo objects are shared across worker threads; guard creation
+        with repos_lock:
+            if repo_name not in repos:
+                repos[repo_name] = load_repo(repo_name, language)
+            return repos[repo_name]
+
+    def build_instance(pull, instance_id):
+        # Runs on a worker thread; everything network-bound lives here
+        repo = get_repo(pull["base"]["repo"]["full_name"])
+        return create_instance(repo, pull, instance_id)
+
     base_instances = 0
     medium_instances = 0
     high_instances = 0
@@ -96,12 +117,20 @@ def main(pr_file: str, output: str, language:str,token: Optional[str] = None):
     medium_output = output + ".medium"
     high_output = output + ".high"
     seen_prs = set()
+    seen_file = output + ".seen_prs"
+
+    # Ids in the sidecar were fully inspected on an earlier run (even when they
+    # produced no valid instance); loading them is a plain line read, no JSON,
+    # and it stops invalid-but-expensive PRs from being re-fetched on resume
+    if os.path.exists(seen_file):
+        with open(seen_file) as f:
+            seen_prs.update(line.strip() for line in f if line.strip())
 
     # Continue where we left off if output file already exists
     if os.path.exists(base_output):
-        with open(base_output) as f:
+        with open(base_output, "rb") as f:
             for line in f:
-                pr = json.loads(line)
+                pr = orjson.loads(line)
                 if "instance_id" not in pr:
                     pr["instance_id"] = (
                         pr["repo"] + "-" + str(pr["pull_number"])
@@ -117,57 +146,83 @@ def main(pr_file: str, output: str, language:str,token: Optional[str] = None):
 
     logger.info(f"Will skip {len(seen_prs)} pull requests that have already been inspected")
 
-    # Write to .all file for all PRs
-    write_mode_base = "w" if not os.path.exists(base_output) else "a"
-    with open(base_output, write_mode_base) as base_output:
+    # Write to .all file for all PRs; buffered binary handles so each line is
+    # one C-level serialization and writes hit the kernel in 64 KB batches
+    write_mode_base = "wb" if not os.path.exists(base_output) else "ab"
+    with open(base_output, write_mode_base, buffering=1 << 16) as base_output:
         # Write to output file for PRs with test suites
-        write_mode_medium = "w" if not os.path.exists(medium_output) else "a"
-        with open(medium_output, write_mode_medium) as medium_output:
-                write_mode_high = "w" if not os.path.exists(high_output) else "a"
-                with open(high_output, write_mode_high) as high_output:
-                    for ix, line in enumerate(open(pr_file)):
-                        total_instances += 1
-                        pull = json.loads(line)
-                        if ix % 100 == 0:
-                            logger.info(
-                                f"[{pull['base']['repo']['full_name']}] (Up to {ix} checked) "
-                                f"base_intances: {base_instances}, medium_instances: {medium_instances}, high_instances: {high_instances}"
-                            )
-                        # Construct instance fields
-                        instance_id = (
-                            pull["base"]["repo"]["full_name"] + "-" + str(pull["number"])
-                        )
-                        instance_id = instance_id.replace("/", "__")
-                        if instance_id in seen_prs:
-                            # seen_prs -= {instance_id}
-                            continue
-                        if not is_valid_pull(pull):
-                            # Throw out invalid PRs
-                            continue
-                        # Create task instance
-                        repo_name = pull["base"]["repo"]["full_name"]
-                        if repo_name not in repos:
-                            repos[repo_name] = load_repo(repo_name,language)
-                        repo = repos[repo_name]
+        write_mode_medium = "wb" if not os.path.exists(medium_output) else "ab"
+        with open(medium_output, write_mode_medium, buffering=1 << 16) as medium_output:
+                write_mode_high = "wb" if not os.path.exists(high_output) else "ab"
+                with open(high_output, write_mode_high, buffering=1 << 16) as high_output, \
+                        open(seen_file, "a") as seen_output:
+
+                    def handle_result(instance_id, repo_name, future):
+                        # Main thread only: validate the finished instance and write it out
+                        nonlocal base_instances, medium_instances, high_instances
                         try:
-                            instance = create_instance(repo, pull)
-                            if is_valid_instance_base(instance):
-                                # If base valid, write to .base output file
-                                print(
-                                    json.dumps(instance), end="\n", flush=True, file=base_output
-                                )  # write 
-                                base_instances += 1
-                                if is_valid_instance_medium(instance):
-                                    # If medium valid, write to .medium output file
-                                    print(json.dumps(instance), end="\n", flush=True, file=medium_output)
-                                    medium_instances += 1
-                                    if is_valid_instance_high(instance):
-                                        # If high valid, write to .high output file
-                                        print(json.dumps(instance), end="\n", flush=True, file=high_output)
-                                        high_instances += 1
+                            instance = future.result()
                         except Exception as e:
+                            # Not recorded as seen, so transient failures retry next run
                             logger.error(f"[{repo_name}] fail to create instance for {instance_id} {e}")
-                            continue
+                            return
+                        if is_valid_instance_base(instance):
+                            # If base valid, write to .base output file
+                            instance_line = orjson.dumps(instance) + b"\n"
+                            base_output.write(instance_line)
+                            base_instances += 1
+                            if is_valid_instance_medium(instance):
+                                # If medium valid, write to .medium output file
+                                medium_output.write(instance_line)
+                                medium_instances += 1
+                                if is_valid_instance_high(instance):
+                                    # If high valid, write to .high output file
+                                    high_output.write(instance_line)
+                                    high_instances += 1
+                        # Record as seen only after the instance lines are
+                        # buffered, so an id can never be durable while its
+                        # data is lost — worst case a crash re-processes a PR
+                        seen_output.write(instance_id + "\n")
+
+                    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                        pending = deque()
+                        for ix, line in enumerate(open(pr_file)):
+                            total_instances += 1
+                            pull = json.loads(line)
+                            if ix % 100 == 0:
+                                logger.info(
+                                    f"[{pull['base']['repo']['full_name']}] (Up to {ix} checked) "
+                                    f"base_intances: {base_instances}, medium_instances: {medium_instances}, high_instances: {high_instances}"
+                                )
+                                # Checkpoint so a crash loses at most 100 PRs of output
+                                base_output.flush()
+                                medium_output.flush()
+                                high_output.flush()
+                                seen_output.flush()
+                            # Construct instance fields; the escaped repo key is
+                            # cached so each PR costs one f-string, not two
+                            # allocations plus a replace
+                            repo_name = pull["base"]["repo"]["full_name"]
+                            repo_key = repo_keys.get(repo_name)
+                            if repo_key is None:
+                                repo_key = repo_keys[repo_name] = repo_name.replace("/", "__")
+                            instance_id = f"{repo_key}-{pull['number']}"
+                            if instance_id in seen_prs:
+                                # seen_prs -= {instance_id}
+                                continue
+                            if not is_valid_pull(pull):
+                                # Throw out invalid PRs
+                                continue
+                            # Create task instance on a worker thread; drain the
+                            # oldest futures so at most 2x workers are in flight
+                            pending.append(
+                                (instance_id, repo_name,
+                                 executor.submit(build_instance, pull, instance_id))
+                            )
+                            while len(pending) > 2 * MAX_WORKERS:
+                                handle_result(*pending.popleft())
+                        while pending:
+                            handle_result(*pending.popleft())
     logger.info(f"[{', '.join(repos.keys())}] 🎤 Total instances: {total_instances}, base_intances: {base_instances}, medium_instances: {medium_instances}, high_instances: {high_instances}")
     logger.info(f"[{', '.join(repos.keys())}] 🎤 Skipped {len(seen_prs)} pull requests that have already been inspected")
 
@@ -1,4 +1,54 @@
-import re
+from functools import lru_cache
+
+_DIFF_HEADER = "diff --git a/"
+
+# File extensions for major programming languages
+LANGUAGE_SUFFIX = {
+    "Python": (".py",),
+    "Rust": (".rs",),
+    "Go": (".go",),
+    "TypeScript": (".ts", ".tsx"),
+    "JavaScript": (".js", ".jsx", ".mjs"),
+    "Java": (".java",),
+    "C": (".c", ".h"),
+    "C++": (".cpp", ".cc", ".cxx", ".h", ".hpp"),
+    "PHP": (".php",),
+    "Ruby": (".rb",)
+}
+
+def _diff_paths(patch_content: str) -> list:
+    """Extract the changed-file path from every diff header via str.split"""
+    parts = patch_content.split("\n" + _DIFF_HEADER)
+    if patch_content.startswith(_DIFF_HEADER):
+        parts[0] = parts[0][len(_DIFF_HEADER):]
+    else:
+        parts = parts[1:]
+    # The path is everything up to the ' b/' separator on the header line
+    return [part.split(" b/", 1)[0].strip() for part in parts]
+
+@lru_cache(maxsize=16)
+def patch_stats(patch_content: str, language: str) -> tuple:
+    """
+    Compute every statistic the validators need in one scan of the patch.
+
+    The base/medium/high validators are called back to back on the same
+    instance; the small LRU means a megabyte patch is scanned once instead
+    of once per validator. str.split/str.count run in C, roughly an order
+    of magnitude faster than regex-matching each line in Python.
+
+    Args:
+        patch_content (str): Git patch content to analyze
+        language (str): Target programming language
+    Returns:
+        tuple: (newline count, changed-file count, has code edits)
+    """
+    changed_files = _diff_paths(patch_content)
+    suffixes = LANGUAGE_SUFFIX[language]
+    return (
+        patch_content.count("\n"),
+        len(changed_files),
+        any(changed_file.endswith(suffixes) for changed_file in changed_files),
+    )
 
 def is_valid_pull(pull: dict) -> bool:
     """
@@ -25,35 +75,7 @@ def has_code_edited(patch_content: str, language: str) -> bool:
     Returns:
         bool: True if patch contains code files for the specified language
     """
-    # File extensions for major programming languages
-    language_suffix = {
-        "Python": [".py"],
-        "Rust": [".rs"],
-        "Go": [".go"],
-        "TypeScript": [".ts", ".tsx"],
-        "JavaScript": [".js", ".jsx", ".mjs"],
-        "Java": [".java"],
-        "C": [".c", ".h"],
-        "C++": [".cpp", ".cc", ".cxx", ".h", ".hpp"],
-        "PHP": [".php"],
-        "Ruby": [".rb"]
-    }
-    
-    # Extract changed file paths from patch
-    pattern = r'^diff --git a/(.*?) b/'
-    changed_files = set()
-    # print(patch_content)
-    for line in patch_content.split('\n'):
-        match = re.match(pattern, line)
-        if match:
-            file_path = match.group(1).strip()
-            changed_files.add(file_path)
-    # print(changed_files)
-    # Return True if any changed file matches the language's extensions
-    return any(
-        changed_file.endswith(tuple(language_suffix[language])) 
-        for changed_file in changed_files
-    )
+    return patch_stats(patch_content, language)[2]
 
 def is_valid_instance_base(instance: dict) -> bool:
     """
@@ -70,7 +92,11 @@ def is_valid_instance_base(instance: dict) -> bool:
         return False
     if instance["problem_statement"] is None or instance["problem_statement"] == "":
         return False
-    if not has_code_edited(instance["patch"], instance["language"]) or not has_code_edited(instance["test_patch"], instance["language"]):
+    # Scan the (typically far smaller) test patch before the code patch so
+    # most rejections bail out without touching megabyte diffs
+    if not has_code_edited(instance["test_patch"], instance["language"]):
+        return False
+    if not has_code_edited(instance["patch"], instance["language"]):
         return False
     return True
 
@@ -83,9 +109,10 @@ def is_valid_instance_medium(instance: dict) -> bool:
     Returns:
         bool: Whether task instance meets medium validation
     """
-    if instance["patch"].count("\n") > 1000:
+    newlines, diff_count, _ = patch_stats(instance["patch"], instance["language"])
+    if newlines > 1000:
         return False
-    if instance["patch"].count("diff --git a/") > 10:
+    if diff_count > 10:
         return False
     return True
 
@@ -98,8 +125,9 @@ def is_valid_instance_high(instance: dict) -> bool:
     Returns:
         bool: Whether task instance meets high validation
     """
-    if instance["patch"].count("\n") > 500:
+    newlines, diff_count, _ = patch_stats(instance["patch"], instance["language"])
+    if newlines > 500:
         return False
-    if instance["patch"].count("diff --git a/") > 5:
+    if diff_count > 5:
         return False
     return True
\ No newline at end of file
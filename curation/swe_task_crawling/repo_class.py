@@ -8,6 +8,7 @@ from urllib.error import URLError
 import requests
 import os
 import urllib3
+from requests.adapters import HTTPAdapter
 from dateutil import parser
 from fastcore.net import HTTP403ForbiddenError, HTTP404NotFoundError
 
@@ -17,6 +18,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _rate_limit_wait(headers) -> float:
+    """Seconds to sleep after a rate-limited response: Retry-After when the
+    server sends one, otherwise until the x-ratelimit-reset epoch"""
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        return int(retry_after) + 1
+    reset_at = int(headers.get("x-ratelimit-reset", "0"))
+    return max(0.0, reset_at - time.time()) + 1
+
+
 class Repo:
     def __init__(self, owner: str, name: str, token: Optional[str] = None):
         """
@@ -36,6 +47,12 @@ class Repo:
             "Content-Type": "application/json",
         }
         self.full_name = f"{self.owner}/{self.name}"
+        # Keep-alive session so successive GraphQL calls reuse one TLS
+        # connection instead of paying a handshake per request
+        self._session = requests.Session()
+        self._session.mount(
+            "https://", HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        )
 
     def call_api(
         self, query: str, variables: dict = None, max_retries: int = 10
@@ -52,7 +69,7 @@ class Repo:
         attempt = 0
         while True:
             try:
-                response = requests.post(
+                response = self._session.post(
                     self.api_url,
                     json={"query": query, "variables": variables},
                     headers=self.headers,
@@ -77,14 +94,15 @@ class Repo:
                             f"GraphQL Query failed to return data: {response_json}"
                         )
                 elif response.status_code == 403:
-                    while True:
-                        rl = response.headers.get("x-ratelimit-remaining")
-                        logger.error(
-                            f"Got 403 error for token {self.token[:20]}****, wait for 5 minutes"
-                        )
-                        if rl > 0:
-                            break
-                        time.sleep(60 * 5)
+                    # The headers of this response never change, so re-polling
+                    # them is pointless; sleep straight through to the
+                    # advertised reset (or Retry-After) and issue a fresh call
+                    wait = _rate_limit_wait(response.headers)
+                    logger.error(
+                        f"Got 403 error for token {self.token[:20]}****, "
+                        f"waiting {wait:.0f}s until rate limit reset"
+                    )
+                    time.sleep(wait)
                 else:
                     raise Exception(
                         f"GraphQL Query failed to run with status code {response.status_code} for token {self.token[:20]}****. {response.json()}"
@@ -106,14 +124,12 @@ class Repo:
                     )
                     return None
             except HTTP403ForbiddenError as e:
-                while True:
-                    rl = int(response.headers.get("x-ratelimit-remaining"))
-                    logger.error(
-                        f"Got 403 error for token {self.token[:20]}****, wait for 5 minutes"
-                    )
-                    if rl > 0:
-                        break
-                    time.sleep(60 * 5)
+                wait = _rate_limit_wait(response.headers)
+                logger.error(
+                    f"Got 403 error for token {self.token[:20]}****, "
+                    f"waiting {wait:.0f}s until rate limit reset"
+                )
+                time.sleep(wait)
 
     def get_all_loop(
         self,
@@ -167,15 +183,16 @@ class Repo:
                     f"[{self.owner}/{self.name}] Error processing page {page} "
                     f"w/ token {self.token[:10]} - {e}"
                 )
-                while True:
-                    rl = int(response.headers.get("x-ratelimit-remaining"))
-                    if rl > 0:
-                        break
+                if response is None:
+                    # call_api already exhausted its retries; surface the error
+                    raise
+                if int(response.headers.get("x-ratelimit-remaining", "1")) <= 0:
+                    wait = _rate_limit_wait(response.headers)
                     logger.info(
-                        f"[{self.owner}/{self.name}] Waiting for rate limit reset "
-                        f"for token {self.token[:10]}, checking again in 5 minutes"
+                        f"[{self.owner}/{self.name}] Waiting {wait:.0f}s for rate limit reset "
+                        f"for token {self.token[:10]}"
                     )
-                    time.sleep(60 * 5)
+                    time.sleep(wait)
         if not quiet:
             logger.info(
                 f"[{self.owner}/{self.name}] Processed {(page-1)*per_page + len(values)} values"
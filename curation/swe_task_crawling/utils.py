@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import aiohttp
+import asyncio
+import bisect
 import json
 import logging
 import re
 import requests
+import threading
 import time
 import urllib3
 
-from dateutil import parser
+from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from typing import Callable, Iterator, Optional
+from typing import Callable, Iterator, Literal, Optional
 from unidiff import PatchSet
 from urllib.error import URLError
 from http.client import RemoteDisconnected
@@ -19,7 +26,95 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+# Hot-path patterns compiled once at import
+_VERSION_RE = re.compile(r"(\d+\.\d+)(?:\.\d+)?")
+_WS_RE = re.compile(r"\s+")
+_NL_RE = re.compile(r"\n+")
+_SPACES4_RE = re.compile(r"    ")
+_MULTISPACE_RE = re.compile(r"[ ]{2,}")
+
+
+def _parse_iso_ts(date_str: str) -> float:
+    """Timestamp of a fixed-format ISO-8601 date (e.g. 2023-01-01T00:00:00Z);
+    datetime.fromisoformat is ~20x faster than dateutil's guessing parser"""
+    return datetime.fromisoformat(date_str.replace("Z", "+00:00")).timestamp()
+
+
+def _rate_limit_wait(headers) -> float:
+    """Seconds to sleep after a rate-limited response: Retry-After when the
+    server sends one, otherwise until the x-ratelimit-reset epoch"""
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        return int(retry_after) + 1
+    reset_at = int(headers.get("x-ratelimit-reset", "0"))
+    return max(0.0, reset_at - time.time()) + 1
+
+
+@dataclass(slots=True, frozen=True)
+class TagEntry:
+    """One cached tag; slotted so thousand-tag repos stay compact and the
+    hot comparators use attribute loads instead of dict lookups"""
+    name: str
+    oid: str
+    date: str
+    ts: float
+
+
 class Repo:
+    # Single-issue fetch used by get_issue
+    ISSUE_QUERY = """
+    query($owner: String!, $name: String!, $issue_number: Int!) {
+        repository(owner: $owner, name: $name) {
+            issue(number: $issue_number) {
+                number
+                title
+                body
+            }
+        }
+    }
+    """
+
+    # Everything extract_problem_statement_and_hints needs for one resolved
+    # issue — body, comments and the PR's commits — in a single round-trip
+    ISSUE_BUNDLE_QUERY = """
+    query($owner: String!, $name: String!, $issue_number: Int!, $pull_number: Int!) {
+        repository(owner: $owner, name: $name) {
+            issue(number: $issue_number) {
+                number
+                title
+                body
+                comments(first: 100) {
+                    pageInfo {
+                        endCursor
+                        hasNextPage
+                    }
+                    nodes {
+                        body
+                        updatedAt
+                    }
+                }
+            }
+            pullRequest(number: $pull_number) {
+                commits(first: 100) {
+                    pageInfo {
+                        endCursor
+                        hasNextPage
+                    }
+                    nodes {
+                        commit {
+                            author {
+                                date
+                            }
+                            url
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """
+
     def __init__(self, owner: str, name: str, language:str = "Python",token: Optional[str] = None):
         """
         Init to retrieve target repository and create ghapi tool
@@ -39,9 +134,25 @@ class Repo:
             'Content-Type': 'application/json'
         }
         self.full_name = f"{self.owner}/{self.name}"
-        # Cache for storing tags with their dates
+        # Keep-alive session so successive GraphQL calls reuse one TLS
+        # connection instead of paying a handshake per request
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+        # Cache for storing tags with their dates; the load is lazy and Repo
+        # objects are shared across worker threads, so it is guarded by a lock
+        # (the per-number memo dicts below are single-assignment under the GIL
+        # and need no such guard)
         self._tags_cache = None
         self._tags_cache_loaded = False
+        self._tags_lock = threading.Lock()
+        # Ascending-timestamp view of the cache for binary search
+        self._tags_asc = []
+        self._tag_ts_asc = []
+        # Per-repo memoization of single-object fetches; instance-level dicts
+        # rather than lru_cache so entries die with the Repo object
+        self._issue_cache = {}
+        self._pull_cache = {}
+        self._pull_commits_cache = {}
 
     def _load_tags_cache(self):
         """
@@ -49,18 +160,47 @@ class Repo:
         """
         if self._tags_cache_loaded:
             return
-        
-        logger.info(f"Loading tags cache for {self.full_name}")
-        
-        # Get all tags
+        with self._tags_lock:
+            self._load_tags_cache_locked()
+
+    def _load_tags_cache_locked(self):
+        """
+        Body of _load_tags_cache; runs under _tags_lock so concurrent callers
+        neither re-fetch the tags nor mutate the cache mid-sort
+        """
+        # Double-check: another thread may have finished the load while this
+        # one was waiting on the lock
+        if self._tags_cache_loaded:
+            return
+
+        logger.info("Loading tags cache for %s", self.full_name)
+
+        # Get all tags with their commit dates in one query per page of 100:
+        # committedDate is reachable directly under target (inlining through
+        # annotated Tag objects), so the old per-tag date lookup is gone
         query = """
-        query($owner: String!, $name: String!) {
+        query($owner: String!, $name: String!, $after: String) {
             repository(owner: $owner, name: $name) {
-                refs(refPrefix: "refs/tags/", first: 100) {
+                refs(refPrefix: "refs/tags/", first: 100, after: $after) {
+                    pageInfo {
+                        endCursor
+                        hasNextPage
+                    }
                     nodes {
                         name
                         target {
                             oid
+                            ... on Commit {
+                                committedDate
+                            }
+                            ... on Tag {
+                                target {
+                                    oid
+                                    ... on Commit {
+                                        committedDate
+                                    }
+                                }
+                            }
                         }
                     }
                 }
@@ -69,56 +209,50 @@ class Repo:
         """
         variables = {
             "owner": self.owner,
-            "name": self.name
+            "name": self.name,
+            "after": None
         }
-        
+
         try:
-            response = self.call_api(query, variables)
-            if response and response.status_code == 200:
-                data = response.json()["data"]
-                if data["repository"]["refs"]["nodes"]:
-                    self._tags_cache = []
-                    
-                    # Get dates for all tags
-                    for tag in data["repository"]["refs"]["nodes"]:
-                        tag_oid = tag["target"]["oid"]
-                        tag_query = """
-                        query($owner: String!, $name: String!, $oid: GitObjectID!) {
-                            repository(owner: $owner, name: $name) {
-                                object(oid: $oid) {
-                                    ... on Commit {
-                                        committedDate
-                                    }
-                                }
-                            }
-                        }
-                        """
-                        tag_variables = {
-                            "owner": self.owner,
-                            "name": self.name,
-                            "oid": tag_oid
-                        }
-                        
-                        tag_response = self.call_api(tag_query, tag_variables)
-                        if tag_response and tag_response.status_code == 200:
-                            tag_data = tag_response.json()["data"]
-                            if tag_data["repository"]["object"]:
-                                tag_date = tag_data["repository"]["object"]["committedDate"]
-                                self._tags_cache.append({
-                                    "name": tag["name"],
-                                    "oid": tag_oid,
-                                    "date": tag_date
-                                })
-                                logger.debug(f"Cached tag: {tag['name']} with date: {tag_date}")
-                    
-                    # Sort tags by date (newest first)
-                    self._tags_cache.sort(key=lambda x: parser.parse(x["date"]), reverse=True)
-                    logger.info(f"Loaded {len(self._tags_cache)} tags into cache for {self.full_name}")
-                    
+            self._tags_cache = []
+            while True:
+                response = self.call_api(query, variables)
+                if not response or response.status_code != 200:
+                    break
+                refs = response.json()["data"]["repository"]["refs"]
+                for tag in refs["nodes"]:
+                    target = tag["target"]
+                    # Annotated tags nest the commit one level deeper
+                    if "committedDate" not in target and target.get("target"):
+                        target = target["target"]
+                    tag_date = target.get("committedDate")
+                    if tag_date:
+                        # Parse the date once at insertion; sorting and the
+                        # closest-tag search only ever compare the timestamp
+                        self._tags_cache.append(TagEntry(
+                            name=tag["name"],
+                            oid=target["oid"],
+                            date=tag_date,
+                            ts=_parse_iso_ts(tag_date)
+                        ))
+                        logger.debug("Cached tag: %s with date: %s", tag["name"], tag_date)
+                if not refs["pageInfo"]["hasNextPage"]:
+                    break
+                variables["after"] = refs["pageInfo"]["endCursor"]
+
+            # Sort tags by date (newest first)
+            self._tags_cache.sort(key=attrgetter("ts"), reverse=True)
+            # Parallel ascending view so the closest-date lookup can bisect
+            self._tags_asc = self._tags_cache[::-1]
+            self._tag_ts_asc = [tag.ts for tag in self._tags_asc]
+            logger.info("Loaded %d tags into cache for %s", len(self._tags_cache), self.full_name)
+
             self._tags_cache_loaded = True
         except Exception as e:
             logger.error(f"Failed to load tags cache for {self.full_name}: {e}")
             self._tags_cache = []
+            self._tags_asc = []
+            self._tag_ts_asc = []
             self._tags_cache_loaded = True
 
     def call_api(self, query: str, variables: dict = None, max_retries: int = 10) -> dict|None:
@@ -134,7 +268,7 @@ class Repo:
         attempt = 0
         while True:
             try:
-                response = requests.post(self.api_url, json={'query': query, 'variables': variables}, headers=self.headers)
+                response = self._session.post(self.api_url, json={'query': query, 'variables': variables}, headers=self.headers)
                 if response.status_code == 200:
                     response_json = response.json()
                     rl = int(response.headers.get('x-ratelimit-remaining'))
@@ -149,12 +283,12 @@ class Repo:
                     else:
                         raise Exception(f"GraphQL Query failed to return data: {response_json}")
                 elif response.status_code == 403:
-                    while True:
-                        rl = response.headers.get('x-ratelimit-remaining')
-                        logger.error(f"Got 403 error for token {self.token[:20]}****, wait for 5 minutes")
-                        if rl > 0:
-                            break
-                        time.sleep(60 * 5)
+                    # The headers of this response never change, so re-polling
+                    # them is pointless; sleep straight through to the
+                    # advertised reset (or Retry-After) and issue a fresh call
+                    wait = _rate_limit_wait(response.headers)
+                    logger.error(f"Got 403 error for token {self.token[:20]}****, waiting {wait:.0f}s until rate limit reset")
+                    time.sleep(wait)
                 else:
                     raise Exception(f"GraphQL Query failed to run with status code {response.status_code} for token {self.token[:20]}****. {response.json()}")
             except (requests.exceptions.RequestException, URLError, RemoteDisconnected, urllib3.exceptions.MaxRetryError, requests.exceptions.ConnectTimeout) as e:
@@ -167,12 +301,98 @@ class Repo:
                     return None
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 403:
-                    while True:
-                        rl = int(response.headers.get('x-ratelimit-remaining'))
-                        logger.error(f"Got 403 error for token {self.token[:20]}****, wait for 5 minutes")
-                        if rl > 0:
-                            break
-                        time.sleep(60 * 5)
+                    wait = _rate_limit_wait(e.response.headers)
+                    logger.error(f"Got 403 error for token {self.token[:20]}****, waiting {wait:.0f}s until rate limit reset")
+                    time.sleep(wait)
+
+    async def _call_api_async(self, session: aiohttp.ClientSession, query: str, variables: dict = None, max_retries: int = 10) -> dict|None:
+        """
+        Async counterpart of call_api for issuing independent queries
+        concurrently over one shared session
+
+        Args:
+            session (aiohttp.ClientSession): shared HTTP session
+            query (str): GraphQL query string
+            variables (dict): variables for the GraphQL query
+        Return:
+            values (dict): parsed response JSON of `query`, or None
+        """
+        attempt = 0
+        while True:
+            try:
+                async with session.post(self.api_url, json={'query': query, 'variables': variables}, headers=self.headers) as response:
+                    if response.status == 200:
+                        response_json = await response.json()
+                        if "data" in response_json:
+                            return response_json
+                        raise Exception(f"GraphQL Query failed to return data: {response_json}")
+                    elif response.status == 403:
+                        # Wait out the rate limit like the sync path instead of
+                        # failing every gathered task at once
+                        wait = _rate_limit_wait(response.headers)
+                        logger.error(f"Got 403 error for token {self.token[:20]}****, waiting {wait:.0f}s until rate limit reset")
+                        await asyncio.sleep(wait)
+                    else:
+                        raise Exception(f"GraphQL Query failed to run with status code {response.status} for token {self.token[:20]}****")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"❗️ 📢 Attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(20)
+                    attempt += 1
+                else:
+                    print(f"❗️ 📢 Still got connection error after {max_retries} attempts")
+                    return None
+
+    async def get_issue_bundle_async(self, session: aiohttp.ClientSession, issue_number: int, pull_number: int) -> dict|None:
+        """
+        Fetch an issue, its comments and the PR's commits in one query.
+
+        The single-page (100-node) case covers almost every issue; larger
+        comment/commit lists fall back to the paginated fetchers.
+
+        Return:
+            bundle (dict): {"issue": {...}, "comments": [...],
+            "commits": [(date, url), ...]} or None
+        """
+        variables = {
+            "owner": self.owner,
+            "name": self.name,
+            "issue_number": issue_number,
+            "pull_number": pull_number,
+        }
+        response_json = await self._call_api_async(session, self.ISSUE_BUNDLE_QUERY, variables)
+        if response_json is None:
+            return None
+        data = response_json["data"]["repository"]
+        issue = data["issue"]
+        if issue is None:
+            return None
+
+        comments = issue["comments"]["nodes"]
+        if issue["comments"]["pageInfo"]["hasNextPage"]:
+            # Rare >100-comment issue: refetch the full list with pagination
+            comments = list(self.get_issue_comments(issue_number))
+
+        commits = []
+        pr = data["pullRequest"]
+        if pr is not None:
+            if pr["commits"]["pageInfo"]["hasNextPage"]:
+                commits = self.get_pull_commits_list(pull_number)
+            else:
+                commits = [
+                    (node["commit"]["author"]["date"], node["commit"]["url"])
+                    for node in pr["commits"]["nodes"]
+                ]
+
+        return {
+            "issue": {
+                "number": issue["number"],
+                "title": issue["title"],
+                "body": issue["body"],
+            },
+            "comments": comments,
+            "commits": commits,
+        }
 
     def get_file_content_at_commit(self, file_path: str, commit_sha: str) -> str:
         """
@@ -222,7 +442,7 @@ class Repo:
         """
         try:
             # Print crawling flag
-            logger.info(f"🔍 Crawling version for commit: {commit_sha}")
+            logger.info("🔍 Crawling version for commit: %s", commit_sha)
             
             # Load tags cache if not already loaded
             self._load_tags_cache()
@@ -251,68 +471,72 @@ class Repo:
                 commit_data = commit_response.json()["data"]
                 if commit_data["repository"]["object"]:
                     commit_date = commit_data["repository"]["object"]["committedDate"]
-                    logger.debug(f"Commit {commit_sha} date: {commit_date}")
+                    logger.debug("Commit %s date: %s", commit_sha, commit_date)
             
             # First try: exact match using cache
             if self._tags_cache:
                 matching_tags = [
                     tag for tag in self._tags_cache
-                    if tag["oid"] == commit_sha
+                    if tag.oid == commit_sha
                 ]
-                logger.debug(f"Found {len(matching_tags)} exact matching tags for commit {commit_sha}")
+                logger.debug("Found %d exact matching tags for commit %s", len(matching_tags), commit_sha)
                 
                 if matching_tags:
                     # Extract version from tag name
-                    tag_name = matching_tags[0]["name"]
-                    tag_date = matching_tags[0]["date"]
-                    logger.debug(f"Using tag: {tag_name}")
+                    tag_name = matching_tags[0].name
+                    tag_date = matching_tags[0].date
+                    logger.debug("Using tag: %s", tag_name)
                     # Use regex pattern to extract major.minor version
-                    match = re.search(r"(\d+\.\d+)(?:\.\d+)?", tag_name)
+                    match = _VERSION_RE.search(tag_name)
                     if match:
                         version = match.group(1)
                         # Print version and date info
-                        logger.info(f"✅ Found exact match - Version: {version}, Tag: {tag_name}, Date: {tag_date}, Commit: {commit_sha}")
+                        logger.info("✅ Found exact match - Version: %s, Tag: %s, Date: %s, Commit: %s", version, tag_name, tag_date, commit_sha)
                         return version
                     else:
-                        logger.debug(f"No version match in tag name: {tag_name}")
+                        logger.debug("No version match in tag name: %s", tag_name)
                 else:
                     # Second try: find tag with closest date to commit
                     if commit_date and self._tags_cache:
                         # Find tag with closest date to commit
-                        commit_timestamp = parser.parse(commit_date).timestamp()
-                        closest_tag = min(self._tags_cache, key=lambda x: abs(parser.parse(x["date"]).timestamp() - commit_timestamp))
-                        logger.debug(f"Closest tag: {closest_tag['name']} with date {closest_tag['date']}")
+                        # Binary-search the sorted timestamps and compare the
+                        # two neighbors instead of scanning every tag
+                        commit_timestamp = _parse_iso_ts(commit_date)
+                        i = bisect.bisect_left(self._tag_ts_asc, commit_timestamp)
+                        neighbors = self._tags_asc[max(0, i - 1):i + 1]
+                        closest_tag = min(neighbors, key=lambda x: abs(x.ts - commit_timestamp))
+                        logger.debug("Closest tag: %s with date %s", closest_tag.name, closest_tag.date)
                         
                         # Extract version from tag name
-                        tag_name = closest_tag["name"]
-                        tag_date = closest_tag["date"]
-                        match = re.search(r"(\d+\.\d+)(?:\.\d+)?", tag_name)
+                        tag_name = closest_tag.name
+                        tag_date = closest_tag.date
+                        match = _VERSION_RE.search(tag_name)
                         if match:
                             version = match.group(1)
                             # Print version and date info
-                            logger.info(f"🎯 Found closest match - Version: {version}, Tag: {tag_name}, Tag Date: {tag_date}, Commit Date: {commit_date}, Commit: {commit_sha}")
+                            logger.info("🎯 Found closest match - Version: %s, Tag: %s, Tag Date: %s, Commit Date: %s, Commit: %s", version, tag_name, tag_date, commit_date, commit_sha)
                             return version
                         else:
-                            logger.debug(f"No version match in closest tag name: {tag_name}")
+                            logger.debug("No version match in closest tag name: %s", tag_name)
                     else:
-                        logger.debug(f"Could not get commit date or no tags in cache")
+                        logger.debug("Could not get commit date or no tags in cache")
                     
                     # Fallback: use the newest tag if no date-based matching works
                     if self._tags_cache:
                         fallback_tag = self._tags_cache[0]  # Already sorted by date (newest first)
-                        tag_name = fallback_tag["name"]
-                        tag_date = fallback_tag["date"]
-                        logger.debug(f"Using fallback tag: {tag_name}")
-                        match = re.search(r"(\d+\.\d+)(?:\.\d+)?", tag_name)
+                        tag_name = fallback_tag.name
+                        tag_date = fallback_tag.date
+                        logger.debug("Using fallback tag: %s", tag_name)
+                        match = _VERSION_RE.search(tag_name)
                         if match:
                             version = match.group(1)
                             # Print version and date info
-                            logger.info(f"🔄 Using fallback - Version: {version}, Tag: {tag_name}, Date: {tag_date}, Commit: {commit_sha}")
+                            logger.info("🔄 Using fallback - Version: %s, Tag: %s, Date: %s, Commit: %s", version, tag_name, tag_date, commit_sha)
                             return version
                         else:
-                            logger.debug(f"No version match in fallback tag name: {tag_name}")
+                            logger.debug("No version match in fallback tag name: %s", tag_name)
             else:
-                logger.debug(f"No tags found in cache for {self.full_name}")
+                logger.debug("No tags found in cache for %s", self.full_name)
             
             logger.warning(f"❌ Version not found for {self.full_name} at {commit_sha}")
             return None
@@ -344,21 +568,21 @@ class Repo:
         page = 1
         while True:
             try:
-                logger.debug(f"Request variables: {variables}")  # Log the request variables
+                logger.debug("Request variables: %s", variables)  # Log the request variables
                 response = self.call_api(query, variables)
                 data = response.json()
                 for key in data_path:
                     data = data[key]
                 values = data["nodes"]
-                logger.debug(f"Page {page} values: {values}")  # Log the values returned
+                logger.debug("Page %d values: %s", page, values)  # Log the values returned
                 if not values:
                     break
                 yield from values
                 if not quiet:
                     rl = int(response.headers.get('x-ratelimit-remaining'))
                     logger.info(
-                        f"[{self.owner}/{self.name}] Processed page {page} ({per_page} values per page). "
-                        f"Remaining calls: {rl}"
+                        "[%s/%s] Processed page %d (%d values per page). Remaining calls: %d",
+                        self.owner, self.name, page, per_page, rl
                     )
                 if num_pages is not None and page >= num_pages:
                     break
@@ -371,18 +595,20 @@ class Repo:
                     f"[{self.owner}/{self.name}] Error processing page {page} "
                     f"w/ token {self.token[:10]} - {e}"
                 )
-                while True:
-                    rl = int(response.headers.get('x-ratelimit-remaining'))
-                    if rl > 0:
-                        break
+                if response is None:
+                    # call_api already exhausted its retries; surface the error
+                    raise
+                if int(response.headers.get('x-ratelimit-remaining', '1')) <= 0:
+                    wait = _rate_limit_wait(response.headers)
                     logger.info(
-                        f"[{self.owner}/{self.name}] Waiting for rate limit reset "
-                        f"for token {self.token[:10]}, checking again in 5 minutes"
+                        "[%s/%s] Waiting %.0fs for rate limit reset for token %s",
+                        self.owner, self.name, wait, self.token[:10]
                     )
-                    time.sleep(60 * 5)
+                    time.sleep(wait)
         if not quiet:
             logger.info(
-                f"[{self.owner}/{self.name}] Processed {(page-1)*per_page + len(values)} values"
+                "[%s/%s] Processed %d values",
+                self.owner, self.name, (page - 1) * per_page + len(values)
             )
 
     def get_pull_commits(self, pull_number: int, quiet: bool = True) -> Iterator:
@@ -420,6 +646,19 @@ class Repo:
         }
         return self.get_all_loop(query, variables, ["data", "repository", "pullRequest", "commits"], quiet=quiet)
 
+    def get_pull_commits_list(self, pull_number: int, quiet: bool = True) -> list:
+        """
+        Per-repo-cached (date, url) pairs for a PR's commits, pulled from the
+        pagination generator in a single pass. Callers only ever need the
+        first commit's date and the urls, so the full node dicts are not kept.
+        """
+        if pull_number not in self._pull_commits_cache:
+            self._pull_commits_cache[pull_number] = [
+                (commit["commit"]["author"]["date"], commit["commit"]["url"])
+                for commit in self.get_pull_commits(pull_number, quiet=quiet)
+            ]
+        return self._pull_commits_cache[pull_number]
+
     def get_issue_comments(self, issue_number: int, quiet: bool = True) -> Iterator:
         """
         Get all comments for an issue.
@@ -476,37 +715,30 @@ class Repo:
             }
         }
         """
-        variables = {
-            "owner": self.owner,
-            "name": self.name,
-            "pull_number": pull_number,
-        }
-        return self.call_api(query, variables)
+        if pull_number not in self._pull_cache:
+            variables = {
+                "owner": self.owner,
+                "name": self.name,
+                "pull_number": pull_number,
+            }
+            self._pull_cache[pull_number] = self.call_api(query, variables)
+        return self._pull_cache[pull_number]
 
     def get_issue(self, issue_number: int) -> dict:
         """
         Wrapper for API call to get a single issue
-        
+
         Args:
             issue_number (int): number of issue to return
         """
-        query = """
-        query($owner: String!, $name: String!, $issue_number: Int!) {
-            repository(owner: $owner, name: $name) {
-                issue(number: $issue_number) {
-                    number
-                    title
-                    body
-                }
+        if issue_number not in self._issue_cache:
+            variables = {
+                "owner": self.owner,
+                "name": self.name,
+                "issue_number": issue_number,
             }
-        }
-        """
-        variables = {
-            "owner": self.owner,
-            "name": self.name,
-            "issue_number": issue_number,
-        }
-        return self.call_api(query, variables)
+            self._issue_cache[issue_number] = self.call_api(self.ISSUE_QUERY, variables)
+        return self._issue_cache[issue_number]
 
 
 def extract_problem_statement_and_hints(pull: dict, repo: Repo) -> tuple[str, str]:
@@ -523,86 +755,118 @@ def extract_problem_statement_and_hints(pull: dict, repo: Repo) -> tuple[str, st
     if repo.name == "django":
         return extract_problem_statement_and_hints_django(pull, repo)
 
-    problem_text = ""   # issue title and body
-    hint_text = ""      # issue discussions (cutoff at first commit)
-    all_hint_text = ""  # all issue discussions
-
-    for issue_number in pull["resolved_issues"]:
-        issue = repo.get_issue(issue_number)
-        if issue is None:
+    problem_parts = []   # issue title and body
+    hint_parts = []      # issue discussions (cutoff at first commit)
+    all_hint_parts = []  # all issue discussions
+
+    # One bundled query per resolved issue brings back the issue body, its
+    # comments and the PR's commits together — the bundles themselves are
+    # fetched in a concurrent burst
+    bundles = asyncio.run(
+        _fetch_issue_bundles_async(repo, pull["resolved_issues"], pull["number"])
+    )
+
+    # The PR's commits are identical across bundles; take them from the first
+    # usable one (or fetch directly when no issue could be bundled)
+    commits = next((bundle["commits"] for bundle in bundles if bundle is not None), None)
+    if commits is None:
+        commits = repo.get_pull_commits_list(pull["number"])
+    commit_urls = [url for _, url in commits]
+    commit_time = None
+    if commits:
+        # Time of first commit in PR
+        commit_time = _parse_iso_ts(commits[0][0])
+
+    for bundle in bundles:
+        if bundle is None:
             continue
-        issue = issue.json()["data"]
+        issue = bundle["issue"]
 
-        title = issue["repository"]["issue"]["title"] if issue["repository"]["issue"]["title"] else ""
-        body = issue["repository"]["issue"]["body"] if issue["repository"]["issue"]["body"] else ""
-        problem_text += f"{title}\n{body}\n"
+        title = issue["title"] if issue["title"] else ""
+        body = issue["body"] if issue["body"] else ""
+        problem_parts.append(f"{title}\n{body}\n")
 
-        issue_number = issue["repository"]["issue"]["number"]
-        single_hint, single_all_hint, commit_urls = _extract_hints(pull, repo, issue_number)
-        hint_text += (single_hint + "\n\n")
-        all_hint_text += (single_all_hint + "\n\n")
+        if commit_time is None:
+            # No commits means no hint cutoff to compute
+            single_hint, single_all_hint = "", ""
+        else:
+            single_hint, single_all_hint = _extract_hints(bundle["comments"], commit_time)
+        hint_parts.append(single_hint + "\n\n")
+        all_hint_parts.append(single_all_hint + "\n\n")
 
-    return problem_text, hint_text, all_hint_text, commit_urls
+    # Join once at the end; += in the loop re-copies the accumulated text
+    # for every resolved issue
+    return "".join(problem_parts), "".join(hint_parts), "".join(all_hint_parts), commit_urls
 
 
-def _extract_hints(pull: dict, repo: Repo, issue_number: int) -> list[str]:
+async def _fetch_issue_bundles_async(repo: Repo, issue_numbers: list[int], pull_number: int) -> list:
     """
-    Extract hints from comments associated with a pull request (before first commit)
+    Fetch the issue bundles of a PR concurrently, bounded to stay under
+    GitHub's secondary rate limits
 
     Args:
-        pull (dict): PR dictionary object from GitHub
         repo (Repo): Repo object
-        issue_number (int): issue number
+        issue_numbers (list): issue numbers to fetch
+        pull_number (int): pull request number
+    Return:
+        bundles (list): issue bundles (None for failed fetches)
+    """
+    sem = asyncio.Semaphore(10)
+
+    async def fetch(session, issue_number):
+        async with sem:
+            return await repo.get_issue_bundle_async(session, issue_number, pull_number)
+
+    connector = aiohttp.TCPConnector(limit=20)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[fetch(session, issue_number) for issue_number in issue_numbers]
+        )
+
+
+def _extract_hints(all_issue_comments, commit_time: float) -> tuple[str, str]:
+    """
+    Extract hints from comments associated with a pull request (before first commit)
+
+    Args:
+        all_issue_comments: iterable of issue comment nodes
+        commit_time (float): timestamp of the first commit in the PR
     Return:
         issue_hint_comments: issue comments (cutoff at first commit)
         issue_all_comments: issue comments
-        commit_urls: list of commit urls
     """
-    # Get all commits in PR
-    commits = repo.get_pull_commits(pull["number"])
-
-    commits = list(commits)
-    if len(commits) == 0:
-        # If there are no comments, return no hints
-        return "", "", []
-
-    # Get time of first commit in PR
-    commit_time = commits[0]["commit"]["author"]["date"]  # str
-    commit_time = parser.parse(commit_time).timestamp()
-
-    # Get commit urls
-    commit_urls = []
-    for commit in commits:
-        commit_urls.append(commit["commit"]["url"])
-
-    # Get all comments in issue
-    all_issue_comments = repo.get_issue_comments(issue_number)
-    all_issue_comments = list(all_issue_comments)
     # Iterate through all comments, only keep comments created before first commit
     issue_hint_comments = list()
     issue_all_comments = list()
-    for comment in all_issue_comments:
-        comment_time = time.mktime(
-            time.strptime(comment["updatedAt"], "%Y-%m-%dT%H:%M:%SZ")
-        )  # use updated_at instead of created_at
-        if comment_time < commit_time:
-            # only include information available before the first commit was created
-            issue_hint_comments.append(comment)
+    comments_iter = iter(all_issue_comments)
+    for comment in comments_iter:
         issue_all_comments.append(comment)
+        # use updated_at instead of created_at
+        if _parse_iso_ts(comment["updatedAt"]) >= commit_time:
+            # Comments arrive in chronological order, so nothing after this
+            # one can be a hint; collect the rest without parsing timestamps
+            issue_all_comments.extend(comments_iter)
+            break
+        # only include information available before the first commit was created
+        issue_hint_comments.append(comment)
     assert len(issue_hint_comments) <= len(issue_all_comments)
 
     # Keep text from comments
     issue_hint_comments = "\n".join([comment["body"] for comment in issue_hint_comments])
     issue_all_comments = "\n".join([comment["body"] for comment in issue_all_comments])
-    # return issue_hint_comments, issue_all_comments
-    return issue_hint_comments, issue_all_comments, commit_urls
+    return issue_hint_comments, issue_all_comments
+
+
+# Shared keep-alive session for raw diff and ticket page downloads
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
 
 
 def wrapped_requests_get(url: str, max_retries: int = 10) -> requests.Response:
     attempt = 0
     while attempt < max_retries:
         try:
-            response = requests.get(url)
+            response = _SESSION.get(url)
             return response
         except requests.exceptions.HTTPError as e:
             logger.info(f"Resource not found: {e}")
@@ -617,33 +881,75 @@ def wrapped_requests_get(url: str, max_retries: int = 10) -> requests.Response:
                 print(f"❗️ 📢 Still got connection error after {max_retries} attempts")
                 return None
 
-def extract_patches(pull: dict, repo: Repo) -> tuple[str, str]:
+
+# Marks a patched file as part of the test suite: whole path segments or a
+# "test_"-style prefix, plus "_test"-style suffixes (foo_test.py, unit_tests/,
+# _test.go). Segment anchoring still stops substrings like "latest/" or
+# "contest.py" from being misclassified, which the old any(word in path)
+# check allowed
+_TEST_PATH_RE = re.compile(
+    r"(?:^|/)(?:tests?|e2e|testing)(?:/|_|\b)|_tests?(?:\.|/|$)", re.IGNORECASE
+)
+
+
+def extract_patches(pull: dict, repo: Repo, which: Literal["fix", "test", "both"] = "both") -> tuple[str, str]:
     """
     Get patch and test patch from PR
 
     Args:
         pull (dict): PR dictionary object from GitHub
         repo (Repo): Repo object
+        which (str): which side to serialize; str(PatchedFile) re-renders
+            every hunk line, so skipping an unused side is a real saving
     Return:
-        patch_change_str (str): gold patch
-        patch_test_str (str): test patch
+        patch_change_str (str): gold patch ("" when which="test")
+        patch_test_str (str): test patch ("" when which="fix")
     """
     # patch = requests.get(pull["diff_url"]).text
+    # Load the diff as one string: line-based streaming went through
+    # splitlines() semantics, which treats \r, form feeds etc. inside diff
+    # content as line breaks and silently rewrites the patch
     patch = wrapped_requests_get(pull["diff_url"]).text
-    patch_test = ""
-    patch_fix  = ""
-    for hunk in PatchSet(patch):
-        if any(
-            test_word in hunk.path for test_word in
-            ['test', 'tests', 'e2e', 'testing']
-        ):
-            patch_test += str(hunk)
-        else:
-            patch_fix += str(hunk)
-    return patch_fix, patch_test
+    patch_set = PatchSet(patch)
+    # Partition whole files and serialize each at most once; += on the two
+    # accumulator strings went quadratic on large diffs
+    fix_parts = []
+    test_parts = []
+    for patched_file in patch_set:
+        if _TEST_PATH_RE.search(patched_file.path):
+            if which != "fix":
+                test_parts.append(str(patched_file))
+        elif which != "test":
+            fix_parts.append(str(patched_file))
+    return "".join(fix_parts), "".join(test_parts)
 
 
 ### MARK: Repo Specific Parsing Functions ###
+async def _fetch_django_tickets_async(issue_numbers: list[int]) -> list:
+    """
+    Fetch Django Trac ticket pages concurrently, bounded to stay polite to
+    the Trac instance
+
+    Args:
+        issue_numbers (list): ticket numbers to fetch
+    Return:
+        pages (list): (issue_number, status, html) tuples in input order
+    """
+    sem = asyncio.Semaphore(8)
+
+    async def fetch(session, issue_number):
+        url = f"https://code.djangoproject.com/ticket/{issue_number}"
+        async with sem:
+            async with session.get(url) as resp:
+                return issue_number, resp.status, await resp.text()
+
+    connector = aiohttp.TCPConnector(limit=8)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[fetch(session, issue_number) for issue_number in issue_numbers]
+        )
+
+
 def extract_problem_statement_and_hints_django(
     pull: dict, repo: Repo
 ) -> tuple[str, list[str]]:
@@ -659,22 +965,23 @@ def extract_problem_statement_and_hints_django(
     """
     text = ""
     all_hints_text = list()
-    for issue_number in pull["resolved_issues"]:
-        url = f"https://code.djangoproject.com/ticket/{issue_number}"
-        # resp = requests.get(url)
-        resp = wrapped_requests_get(url)
-        if resp.status_code != 200:
+    # Pull every ticket page down in one concurrent burst, then parse the
+    # HTML serially (parsing is CPU-bound, fetching is pure network wait)
+    pages = asyncio.run(_fetch_django_tickets_async(pull["resolved_issues"]))
+    for issue_number, status, html in pages:
+        if status != 200:
             continue
-        soup = BeautifulSoup(resp.text, "html.parser")
+        # lxml parses the same tree ~5-10x faster than the pure-Python parser
+        soup = BeautifulSoup(html, "lxml")
 
         # Get problem statement (title + body)
         issue_desc = soup.find("div", {"id": "ticket"})
         title = issue_desc.find("h1", class_="searchable").get_text()
-        title = re.sub(r"\s+", " ", title).strip()
+        title = _WS_RE.sub(" ", title).strip()
         body = issue_desc.find("div", class_="description").get_text()
-        body = re.sub(r"\n+", "\n", body)
-        body = re.sub(r"    ", "\t", body)
-        body = re.sub(r"[ ]{2,}", " ", body).strip()
+        body = _NL_RE.sub("\n", body)
+        body = _SPACES4_RE.sub("\t", body)
+        body = _MULTISPACE_RE.sub(" ", body).strip()
         text += f"{title}\n{body}\n"
 
         # Get time of first commit in PR
@@ -685,7 +992,7 @@ def extract_problem_statement_and_hints_django(
         if len(commits) == 0:
             continue
         commit_time = commits[0].commit.author.date
-        commit_time = time.mktime(time.strptime(commit_time, "%Y-%m-%dT%H:%M:%SZ"))
+        commit_time = _parse_iso_ts(commit_time)
 
         # Get all comments before first commit
         comments_html = soup.find("div", {"id": "changelog"})
@@ -698,7 +1005,7 @@ def extract_problem_statement_and_hints_django(
             if comment_resp is None or timestamp_resp is None:
                 continue
 
-            comment_text = re.sub(r"\s+", " ", comment_resp.text).strip()
+            comment_text = _WS_RE.sub(" ", comment_resp.text).strip()
             timestamp = timestamp_resp["title"]
             if timestamp.startswith("See timeline at "):
                 timestamp = timestamp[len("See timeline at ") :]